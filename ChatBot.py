@@ -1,5 +1,6 @@
 from langchain_openai import ChatOpenAI
 from RAGChatbot import VectorStore
+from RAGChatbot.SemanticCache import getSharedCache
 
 from langchain_core.prompts import ChatPromptTemplate
 from langchain.chains import create_history_aware_retriever
@@ -54,20 +55,25 @@ question_answer_chain = create_stuff_documents_chain(llm, qa_prompt)
 class ChatBot:
     
     
-    def __init__(self, id, from_s3=True):
+    def __init__(self, id, from_s3=True, use_cache=True, client=None):
         self.__id = id
         
         if from_s3:
-            self.__vectorStore = VectorStore.getS3VectorStoreFor(self.__id)
+            if client is None:
+                client = VectorStore.getDefaultClient()
+            self.__vectorStore = client.getS3VectorStoreFor(self.__id)
+            bucket_name = client.name
         else:
             print("this is only for debug purposes, use from_s3=True for production")
-            self.__vectorStore = VectorStore.__getLocalVectorStoreFor(self.__id)
+            self.__vectorStore = VectorStore.getLocalVectorStoreFor(self.__id)
+            bucket_name = None
+        self.__cache = getSharedCache(bucket_name, self.__id) if use_cache else None
         if self.__vectorStore is None:
             print("Vector store could not be loaded")
             raise Exception("Vector store could not be loaded")
         
         self.__retriever = self.__vectorStore.as_retriever(
-            search_type="similarity", search_kwargs={"k": 15}
+            search_type="mmr", search_kwargs={"k": 15, "fetch_k": 64, "lambda_mult": 0.5}
         )
         self.__history_aware_retriever = create_history_aware_retriever(
             llm, self.__retriever, contextualize_q_prompt
@@ -85,7 +91,23 @@ class ChatBot:
         )
 
 
-    def __del__(self):
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+    def close(self):
+        """
+        Deletes the local copy of the vector store used by the chatbot.
+
+        Called automatically when the chatbot is used as a context manager.
+
+        Returns:
+            None
+        """
         VectorStore.deleteLocalVectorStore(self.__id)
 
 
@@ -97,21 +119,44 @@ class ChatBot:
 
     def ask_question(self, question):
             """
-            Asks a question to the chatbot and returns the answer.
+            Asks a question to the chatbot and streams the answer.
+
+            This is a generator and does not return a str, use "".join(chatbot.ask_question(question))
+            to get the whole answer. The answer is only added to the chat history once the stream is fully consumed.
 
             Args:
                 question (str): The question to ask the chatbot.
 
-            Returns:
-                str: The answer provided by the chatbot.
+            Yields:
+                str: The pieces of the answer provided by the chatbot, as they are generated.
             """
-            return self.__conversational_rag_chain.invoke(
+            # Follow-up questions are rewritten using the chat history, so only the first question of a
+            # conversation can be answered from the cache
+            use_cache = self.__cache is not None and len(self.__get_session_history(None).messages) == 0
+            embedding = None
+            if use_cache:
+                embedding = VectorStore.getEmbeddings().embed_query(" ".join(question.lower().split()))
+                answer = self.__cache.lookup(embedding)
+                if answer is not None:
+                    history = self.__get_session_history(None)
+                    history.add_user_message(question)
+                    history.add_ai_message(answer)
+                    yield answer
+                    return
+
+            answer = []
+            for chunk in self.__conversational_rag_chain.stream(
                 {
                 "input": question,},
                 config={
                     "configurable": {"session_id": "None"}
                 },
-            )["answer"]
+            ):
+                if "answer" in chunk:
+                    answer.append(chunk["answer"])
+                    yield chunk["answer"]
+            if use_cache:
+                self.__cache.add(embedding, "".join(answer))
 
 
     def ask_and_print(self, question):
@@ -119,8 +164,9 @@ class ChatBot:
         i = 0
         print("\nAnswer:")
         for chunk in stream:
-            if i == 80:
-                print()
-                i = 0
-            i += 1
-            print(chunk, end="", flush=True)
+            for char in chunk:
+                if i == 80:
+                    print()
+                    i = 0
+                i += 1
+                print(char, end="", flush=True)
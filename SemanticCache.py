@@ -0,0 +1,232 @@
+from typing import List, Optional, Tuple
+import numpy as np
+import threading
+
+# Number of cached vectors dequantized at once by the NumPy similarity scan
+scoreBlockRows = 64
+# Minimum number of cached vectors for which the Numba kernel is used instead of the NumPy scan, below it the
+# kernel is no faster than BLAS
+jitMinRows = 4096
+
+# Answer caches shared by all chatbots of the same vector store, keyed by (bucket name, product ID)
+__sharedCaches = {}
+__sharedCachesLock = threading.Lock()
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+
+def __cosineScoresNumpy(vectors, norms, query, queryNorm):
+    # Rows are dequantized to float32 a block at a time, so BLAS does the scan without a full size temporary
+    floatQuery = query.astype(np.float32)
+    scores = np.empty(vectors.shape[0], dtype=np.float32)
+    for start in range(0, vectors.shape[0], scoreBlockRows):
+        scores[start:start + scoreBlockRows] = vectors[start:start + scoreBlockRows].astype(np.float32) @ floatQuery
+    return scores / (norms * queryNorm)
+
+
+if numba is not None:
+    # Compiled on first use (and cached on disk), so importing the module does not pay for compilation
+    @numba.njit(fastmath=True, cache=True)
+    def __cosineScoresNumba(vectors, norms, query, queryNorm):
+        scores = np.empty(vectors.shape[0], dtype=np.float32)
+        for i in range(vectors.shape[0]):
+            acc = np.int32(0)
+            for j in range(vectors.shape[1]):
+                acc += np.int32(vectors[i, j]) * np.int32(query[j])
+            scores[i] = np.float32(acc) / (norms[i] * queryNorm)
+        return scores
+else:
+    __cosineScoresNumba = None
+
+
+def quantize(vector: np.ndarray) -> Tuple[np.ndarray, float]:
+    """
+    Quantizes a vector to int8 with a single scale, so that vector is approximately quantized * scale.
+
+    Args:
+        vector (np.ndarray): The vector to quantize.
+
+    Returns:
+        Tuple[np.ndarray, float]: The int8 vector and its scale, the scale is 0 for a zero vector.
+    """
+    vector = np.asarray(vector, dtype=np.float32)
+    scale = float(np.max(np.abs(vector))) / 127 if vector.size > 0 else 0.0
+    if scale == 0:
+        return np.zeros(vector.shape, dtype=np.int8), 0.0
+    return np.round(vector / scale).astype(np.int8), scale
+
+
+def topkCosine(vectors: np.ndarray, norms: np.ndarray, query: np.ndarray, queryNorm: float, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Finds the k rows of a quantized matrix most similar to a quantized query vector by cosine similarity.
+
+    Products are accumulated in int32, int16 would overflow for embedding sized vectors. The per-vector
+    scales cancel out in the cosine similarity, so only the norms of the int8 vectors are needed.
+    Scores are computed with a blocked float32 NumPy scan, or with a Numba kernel working on the int8 values
+    directly when numba is installed and there are at least jitMinRows vectors.
+
+    Args:
+        vectors (np.ndarray): int8 matrix with one quantized vector per row.
+        norms (np.ndarray): float32 L2 norms of the rows of vectors.
+        query (np.ndarray): int8 quantized query vector.
+        queryNorm (float): L2 norm of the quantized query vector.
+        k (int): The number of rows to return.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: The indices of the k most similar rows and their similarities, best first.
+    """
+    if __cosineScoresNumba is not None and vectors.shape[0] >= jitMinRows:
+        scores = __cosineScoresNumba(vectors, norms, query, np.float32(queryNorm))
+    else:
+        scores = __cosineScoresNumpy(vectors, norms, query, np.float32(queryNorm))
+    k = min(k, scores.shape[0])
+    if k == 1:
+        top = np.array([np.argmax(scores)])
+        return top, scores[top]
+    top = np.argpartition(scores, -k)[-k:]
+    top = top[np.argsort(scores[top])[::-1]]
+    return top, scores[top]
+
+
+class SemanticCache:
+    """
+    In-memory cache of answers keyed by the embedding of the question.
+
+    Embeddings are stored quantized to int8, a quarter of the memory of float32.
+
+    A lookup returns the answer of the most similar cached question if their cosine similarity
+    reaches the threshold. When the cache is full, the least recently used entry is replaced.
+    The cache can be shared between threads.
+    """
+
+    def __init__(self, threshold: float = 0.95, maxsize: int = 256):
+        """
+        Initializes an empty semantic cache.
+
+        Args:
+            threshold (float, optional): Minimum cosine similarity for a cache hit. Defaults to 0.95, OpenAI
+                embeddings of unrelated questions often reach 0.8 to 0.9.
+            maxsize (int, optional): Maximum number of cached answers. Defaults to 256.
+        """
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self.__vectors = None
+        self.__norms = np.zeros(maxsize, dtype=np.float32)
+        self.__lastUsed = np.zeros(maxsize, dtype=np.int64)
+        self.__answers = []
+        self.__clock = 0
+        self.__lock = threading.Lock()
+
+
+    def __len__(self) -> int:
+        return len(self.__answers)
+
+
+    def lookup(self, embedding: List[float]) -> Optional[str]:
+        """
+        Looks up the answer cached for a question similar to the given one.
+
+        Args:
+            embedding (List[float]): The embedding of the question.
+
+        Returns:
+            Optional[str]: The cached answer, or None if no cached question is similar enough.
+        """
+        query, scale = quantize(embedding)
+        if scale == 0:
+            return None
+        queryNorm = np.linalg.norm(query.astype(np.float32))
+        with self.__lock:
+            if len(self.__answers) == 0:
+                return None
+            count = len(self.__answers)
+            indices, scores = topkCosine(self.__vectors[:count], self.__norms[:count], query, queryNorm, 1)
+            best = int(indices[0])
+            if scores[0] < self.threshold:
+                return None
+            self.__touch(best)
+            return self.__answers[best]
+
+
+    def add(self, embedding: List[float], answer: str) -> None:
+        """
+        Caches the answer of a question.
+
+        Args:
+            embedding (List[float]): The embedding of the question.
+            answer (str): The answer to the question.
+
+        Returns:
+            None
+        """
+        vector, scale = quantize(embedding)
+        if scale == 0:
+            return
+        with self.__lock:
+            if self.__vectors is None:
+                self.__vectors = np.zeros((self.maxsize, vector.shape[0]), dtype=np.int8)
+            if len(self.__answers) < self.maxsize:
+                slot = len(self.__answers)
+                self.__answers.append(answer)
+            else:
+                slot = int(np.argmin(self.__lastUsed))
+                self.__answers[slot] = answer
+            self.__vectors[slot] = vector
+            self.__norms[slot] = np.linalg.norm(vector.astype(np.float32))
+            self.__touch(slot)
+
+
+    def clear(self) -> None:
+        """
+        Removes all cached answers.
+
+        Returns:
+            None
+        """
+        with self.__lock:
+            self.__vectors = None
+            self.__answers = []
+            self.__lastUsed[:] = 0
+
+
+    def __touch(self, slot: int) -> None:
+        self.__clock += 1
+        self.__lastUsed[slot] = self.__clock
+
+
+def getSharedCache(bucket_name: Optional[str], id: str) -> SemanticCache:
+    """
+    Returns the answer cache shared by all chatbots of the given vector store, creating it if needed.
+
+    Args:
+        bucket_name (Optional[str]): The S3 bucket of the vector store, None for a local vector store.
+        id (str): The product ID of the vector store.
+
+    Returns:
+        SemanticCache: The shared cache.
+    """
+    with __sharedCachesLock:
+        return __sharedCaches.setdefault((bucket_name, id), SemanticCache())
+
+
+def clearSharedCache(bucket_name: Optional[str], id: str) -> None:
+    """
+    Drops the answer cache of the given vector store, to be called whenever the vector store is rebuilt or deleted.
+
+    Chatbots created afterwards get an empty cache. Chatbots that already exist keep answering from the vector store
+    they loaded, so their old cache is emptied and detached rather than shared with the new chatbots.
+
+    Args:
+        bucket_name (Optional[str]): The S3 bucket of the vector store, None for a local vector store.
+        id (str): The product ID of the vector store.
+
+    Returns:
+        None
+    """
+    with __sharedCachesLock:
+        cache = __sharedCaches.pop((bucket_name, id), None)
+    if cache is not None:
+        cache.clear()
@@ -1,23 +1,59 @@
-from typing import List
+from typing import List, Tuple
 import os
+import shutil
+from pathlib import Path
 from langchain_community.document_loaders.word_document import Docx2txtLoader
 from langchain_community.document_loaders import UnstructuredExcelLoader
-from langchain_community.document_loaders import PyPDFLoader
+import pymupdf
 from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_chroma import Chroma
 from langchain_openai import OpenAIEmbeddings
 from langchain_community.vectorstores.utils import filter_complex_metadata
 import boto3
-from time import sleep
-
-retryTimes = 3
+from boto3.s3.transfer import TransferConfig
+from botocore.config import Config
+from RAGChatbot.SemanticCache import clearSharedCache
+from time import monotonic
+from functools import lru_cache, partial
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import numpy as np
+import threading
+
+# Attempts per S3 request, retried by botocore with adaptive backoff and jitter
+maxAttempts = 5
+embeddingModel = "text-embedding-ada-002"
+# Number of texts sent to OpenAI per embedding request
+embeddingBatchSize = 1000
+# Maximum number of keys accepted by a single S3 delete_objects request
+deleteBatchSize = 1000
+# HNSW index parameters of newly built collections, vectors are normalized so inner product equals cosine, search_ef is the candidate list size at query time
+hnswConfig = {
+    "hnsw:space": "ip",
+    "hnsw:construction_ef": 200,
+    "hnsw:M": 32,
+    "hnsw:search_ef": 64,
+}
+# Number of files transferred to or from S3 concurrently
+transferWorkers = 16
+# Threads (and connections) used by each of those transfers for the parts of a multipart file
+transferThreadsPerFile = 4
+transferConfig = TransferConfig(max_concurrency=transferThreadsPerFile, multipart_threshold=8 * 1024 * 1024)
+# Maximum number of knowledge pool files parsed concurrently
+loaderWorkers = 8
+# Seconds for which the result of checkS3VectorStoreFor is reused, and the number of IDs remembered per client
+checkCacheTTL = 30
+checkCacheSize = 256
 
 
 debugMode = False
-__bucket = None
-__S3 = None
-__bucket_name = None
+__textSplitter = RecursiveCharacterTextSplitter(
+    chunk_size=1000, chunk_overlap=200, add_start_index=True
+)
+__defaultClient = None
+# PyMuPDF is not thread-safe, PDFs are parsed one at a time while other file types load in parallel
+__pdfLock = threading.Lock()
 
 
 def debug(*args, **kwargs) -> None:
@@ -35,21 +71,78 @@ def debug(*args, **kwargs) -> None:
         print("DEBUG: " + " ".join(map(str, args)), **kwargs)
 
 
-def initS3Storage(bucket_name: str) -> None:
+def initS3Storage(bucket_name: str) -> "VectorStoreClient":
     """
-    Initializes the S3 storage.
+    Initializes the S3 storage used by the module level functions.
 
     Parameters:
     bucket_name (str): The name of the S3 bucket.
 
     Returns:
-    None
+    VectorStoreClient: The client used by the module level functions.
+    """
+    global __defaultClient
+    __defaultClient = VectorStoreClient(bucket_name)
+    return __defaultClient
+
+
+def getDefaultClient() -> "VectorStoreClient":
+    """
+    Returns the client created by initS3Storage.
+
+    Returns:
+        VectorStoreClient: The client used by the module level functions.
+
+    Raises:
+        Exception: If initS3Storage has not been called yet.
     """
-    global __bucket, __S3, __bucket_name
-    __S3 = boto3.client('s3')
-    s3 = boto3.resource('s3')
-    __bucket = s3.Bucket(bucket_name)
-    __bucket_name = bucket_name
+    if __defaultClient is None:
+        raise Exception("S3 storage not initialized, for initialization call initS3Storage(bucket_name) first")
+    return __defaultClient
+
+
+class NormalizedEmbeddings(Embeddings):
+    """
+    Wraps an embeddings client so that every returned vector has unit length.
+    """
+
+    def __init__(self, embeddings: Embeddings):
+        self.embeddings = embeddings
+
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.__normalize(self.embeddings.embed_documents(texts))
+
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.__normalize([self.embeddings.embed_query(text)])[0]
+
+
+    @staticmethod
+    def __normalize(vectors: List[List[float]]) -> List[List[float]]:
+        if len(vectors) == 0:
+            return []
+        matrix = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        return (matrix / norms).tolist()
+
+
+@lru_cache(maxsize=4)
+def getEmbeddings(model: str = embeddingModel) -> NormalizedEmbeddings:
+    """
+    Returns a shared embeddings client for the given OpenAI model, producing unit length vectors.
+
+    The client is created once per model and reused afterwards, so building or loading
+    several vector stores does not set up a new HTTP client every time.
+
+    Args:
+        model (str, optional): The OpenAI embedding model. Defaults to embeddingModel.
+
+    Returns:
+        NormalizedEmbeddings: The cached embeddings client.
+    """
+    return NormalizedEmbeddings(OpenAIEmbeddings(model=model, chunk_size=embeddingBatchSize))
 
 
 def turnOnDebug() -> None:
@@ -70,100 +163,41 @@ def turnOnDebug() -> None:
 
 def buildS3VectorStoreFor(id: str) -> bool:
     """
-    Builds an S3 vector store for the given product ID.
+    Builds an S3 vector store for the given product ID with the client created by initS3Storage.
 
-    Args:
-        id: The product ID for which the S3 vector store needs to be built.
-
-    Returns:
-        bool: True if the S3 vector store is successfully built and uploaded, False otherwise.
+    See VectorStoreClient.buildS3VectorStoreFor.
     """
-    __buildLocalVectorStoreFor(id)
-    if __uploadS3VectorstoreFor(id):
-        deleteLocalVectorStore(id)
-        return True
-    deleteLocalVectorStore(id)
-    return False
+    return getDefaultClient().buildS3VectorStoreFor(id)
 
 
 def getS3VectorStoreFor(id: str) -> Chroma:
     """
-    Retrieves the S3 vector store for the given ID.
-
-    Parameters:
-    id (str): The ID of the vector store.
+    Retrieves the S3 vector store for the given ID with the client created by initS3Storage.
 
-    Returns:
-    Chroma: The S3 vector store if it exists, otherwise None.
+    See VectorStoreClient.getS3VectorStoreFor.
     """
-    if __downloadS3VectorstoreFor(id):
-        return __getLocalVectorStoreFor(id)
-    return None
+    return getDefaultClient().getS3VectorStoreFor(id)
 
 
 def checkS3VectorStoreFor(id: str) -> bool:
     """
-    Check if the S3 vector store contains the specified ID.
-
-    Args:
-        id (str): The ID to check for in the S3 vector store.
+    Check if the S3 vector store contains the specified ID with the client created by initS3Storage.
 
-    Returns:
-        bool: True if the ID is found in the S3 vector store, False otherwise.
+    See VectorStoreClient.checkS3VectorStoreFor.
     """
-    __checkS3init()
-    
-    for retry in range(retryTimes):
-        try:
-            res = __S3.list_objects(Bucket=__bucket_name, Prefix=f"vectorstores/{id}" )
-            if 'Contents' not in res:
-                return False
-            return True
-        except Exception as e:
-            debug("ERROR:", e)
-            debug("Retrying...")
-            sleep(3)
-    return False
+    return getDefaultClient().checkS3VectorStoreFor(id)
 
 
 def deleteS3VectorstoreFor(id: str) -> bool:
     """
-    Deletes the S3 vector store for the given ID.
+    Deletes the S3 vector store for the given ID with the client created by initS3Storage.
 
-    Args:
-        id (str): The ID of the vector store to delete.
-
-    Returns:
-        bool: True if the vector store was successfully deleted, False otherwise.
+    See VectorStoreClient.deleteS3VectorstoreFor.
     """
-    __checkS3init()
-    
-    for retry in range(retryTimes):
-        try:
-            res = __S3.list_objects(Bucket=__bucket_name, Prefix=f"vectorstores/{id}" )
-            if 'Contents' not in res:
-                debug("No vectorstore found, nothing to delete")
-                return True
-            keys = []
-            for content in res["Contents"]:
-                keys.append({"Key": content["Key"]})
-                debug(f"Deleting {content['Key']}")
-                __bucket.delete_objects(Delete={"Objects": keys})
-            return True
+    return getDefaultClient().deleteS3VectorstoreFor(id)
 
-        except Exception as e:
-            debug("ERROR:", e)
-            debug("Retrying...")
-            sleep(3)
-    return False
 
-
-def __checkS3init() -> None:
-    if __bucket is None or __S3 is None:
-        raise Exception("S3 storage not initialized, for initialization call initS3Storage(bucket_name) first")
-
-
-def __buildLocalVectorStoreFor(id: str) -> Chroma:
+def buildLocalVectorStoreFor(id: str) -> Chroma:
     """
     Builds a local vector store for the given ID.
 
@@ -174,6 +208,7 @@ def __buildLocalVectorStoreFor(id: str) -> Chroma:
         Chroma: The built vector store.
 
     """
+    clearSharedCache(None, id)
     documentList = __load_document(id)
     if len(documentList) == 0:
         debug("No documents found!")
@@ -181,7 +216,7 @@ def __buildLocalVectorStoreFor(id: str) -> Chroma:
     return vectorstore
 
 
-def __getLocalVectorStoreFor(id: str) -> Chroma:
+def getLocalVectorStoreFor(id: str) -> Chroma:
     """
     Retrieves the local vector store for the given ID.
 
@@ -195,7 +230,7 @@ def __getLocalVectorStoreFor(id: str) -> Chroma:
     if not os.path.exists(path):
         return None
     try:
-        return Chroma(persist_directory=path, embedding_function=OpenAIEmbeddings())
+        return Chroma(persist_directory=path, embedding_function=getEmbeddings())
     except:
         debug("Vector store could not be loaded")
         return None
@@ -211,122 +246,292 @@ def deleteLocalVectorStore(id: str) -> bool:
     Returns:
         bool: True if the vector store was successfully deleted, False otherwise.
     """
-    vectorStore = __getLocalVectorStoreFor(id)
+    vectorStore = getLocalVectorStoreFor(id)
     if vectorStore is not None:
         vectorStore._client.clear_system_cache()
         Chroma.delete_collection(vectorStore)
     try:
-        os.system(f"rm -rf ./vectorStore/{id}")
+        if os.path.exists(f"./vectorStore/{id}"):
+            shutil.rmtree(f"./vectorStore/{id}")
     except Exception as e:
         debug("ERROR:", e)
         return False
     return True
 
 
-def __downloadS3VectorstoreFor(id: str) -> bool:
+class VectorStoreClient:
     """
-    Downloads the vector store for the given ID from Amazon S3.
-
-    Args:
-        id (str): The ID of the vector store to download.
+    Stores vector stores in an S3 bucket, under the vectorstores/{id}/ prefix.
 
-    Returns:
-        bool: True if the vector store was successfully downloaded, False otherwise.
+    Each client owns its boto3 client, so the connection pool and retry policy are set up once per client.
+    Several clients can be used side by side, e.g. for different buckets.
     """
-    __checkS3init()
-    
-    deleteLocalVectorStore(id)
-    
-    if not os.path.exists(f"./vectorStore/{id}"):
-        os.mkdir(f"./vectorStore/{id}")
-    
-    for retry in range(retryTimes):
+
+    __slots__ = ("s3", "name", "checkCache")
+
+    def __init__(self, bucket_name: str, s3=None):
+        """
+        Initializes a client for the given bucket.
+
+        Args:
+            bucket_name (str): The name of the S3 bucket.
+            s3 (optional): The boto3 S3 client to use. Defaults to a new client with adaptive retries.
+        """
+        if s3 is None:
+            s3 = boto3.client('s3', config=Config(
+                retries={"mode": "adaptive", "max_attempts": maxAttempts},
+                max_pool_connections=transferWorkers * transferThreadsPerFile,
+            ))
+        self.s3 = s3
+        self.name = bucket_name
+        self.checkCache = {}
+
+
+    def buildS3VectorStoreFor(self, id: str) -> bool:
+        """
+        Builds an S3 vector store for the given product ID.
+
+        Args:
+            id: The product ID for which the S3 vector store needs to be built.
+
+        Returns:
+            bool: True if the S3 vector store is successfully built and uploaded, False otherwise.
+        """
+        buildLocalVectorStoreFor(id)
+        if self.__uploadS3VectorstoreFor(id):
+            deleteLocalVectorStore(id)
+            return True
+        deleteLocalVectorStore(id)
+        return False
+
+
+    def getS3VectorStoreFor(self, id: str) -> Chroma:
+        """
+        Retrieves the S3 vector store for the given ID.
+
+        Parameters:
+        id (str): The ID of the vector store.
+
+        Returns:
+        Chroma: The S3 vector store if it exists, otherwise None.
+        """
+        if self.__downloadS3VectorstoreFor(id):
+            return getLocalVectorStoreFor(id)
+        return None
+
+
+    def checkS3VectorStoreFor(self, id: str) -> bool:
+        """
+        Check if the S3 vector store contains the specified ID.
+
+        The result is reused for checkCacheTTL seconds, uploads and deletions through this client reset it.
+
+        Args:
+            id (str): The ID to check for in the S3 vector store.
+
+        Returns:
+            bool: True if the ID is found in the S3 vector store, False otherwise.
+        """
+        cached = self.checkCache.get(id)
+        if cached is not None and monotonic() - cached[1] < checkCacheTTL:
+            return cached[0]
+
         try:
-            res = __S3.list_objects(Bucket=__bucket_name, Prefix=f"vectorstores/{id}" )
-            if 'Contents' not in res:
+            res = self.s3.list_objects_v2(Bucket=self.name, Prefix=f"vectorstores/{id}/", MaxKeys=1)
+            exists = res.get("KeyCount", 0) > 0
+            self.checkCache.pop(id, None)
+            if len(self.checkCache) >= checkCacheSize:
+                self.checkCache.pop(next(iter(self.checkCache)))
+            self.checkCache[id] = (exists, monotonic())
+            return exists
+        except Exception as e:
+            debug("ERROR:", e)
+        return False
+
+
+    def deleteS3VectorstoreFor(self, id: str) -> bool:
+        """
+        Deletes the S3 vector store for the given ID.
+
+        Args:
+            id (str): The ID of the vector store to delete.
+
+        Returns:
+            bool: True if the vector store was successfully deleted, False otherwise.
+        """
+        self.checkCache.pop(id, None)
+        clearSharedCache(self.name, id)
+
+        try:
+            keys = self.__listS3KeysFor(id)
+            if len(keys) == 0:
+                debug("No vectorstore found, nothing to delete")
+                return True
+            failed = []
+            for start in range(0, len(keys), deleteBatchSize):
+                batch = keys[start:start + deleteBatchSize]
+                debug(f"Deleting {len(batch)} objects starting from {batch[0]}")
+                res = self.s3.delete_objects(
+                    Bucket=self.name,
+                    Delete={"Objects": [{"Key": key} for key in batch], "Quiet": True},
+                )
+                # In quiet mode only the keys that could not be deleted are reported
+                for error in res.get("Errors", []):
+                    debug(f"Failed to delete {error.get('Key')}: {error.get('Code')} {error.get('Message')}")
+                    failed.append(error.get("Key"))
+            return len(failed) == 0
+
+        except Exception as e:
+            debug("ERROR:", e)
+        return False
+
+
+    def __listS3KeysFor(self, id: str) -> List[str]:
+        """
+        Lists the keys of all S3 objects belonging to the vector store of the given ID.
+
+        Args:
+            id (str): The ID of the vector store.
+
+        Returns:
+            List[str]: The keys of the stored objects, empty if the vector store does not exist.
+        """
+        paginator = self.s3.get_paginator("list_objects_v2")
+        keys = []
+        for page in paginator.paginate(Bucket=self.name, Prefix=f"vectorstores/{id}/"):
+            keys.extend(content["Key"] for content in page.get("Contents", []))
+        return keys
+
+
+    @staticmethod
+    def __runTransfers(jobs: list) -> list:
+        """
+        Runs the given S3 transfer jobs concurrently. Not to be called directly.
+
+        Args:
+            jobs (list): Callables taking no arguments, each transferring one file.
+
+        Returns:
+            list: The results of the jobs, in the same order as the jobs.
+
+        Raises:
+            Exception: The first exception raised by a job, pending jobs are cancelled.
+        """
+        if len(jobs) == 0:
+            return []
+        with ThreadPoolExecutor(max_workers=min(transferWorkers, len(jobs))) as executor:
+            futures = [executor.submit(job) for job in jobs]
+            try:
+                for future in as_completed(futures):
+                    future.result()
+            except Exception:
+                for future in futures:
+                    future.cancel()
+                raise
+            return [future.result() for future in futures]
+
+
+    def __downloadS3VectorstoreFor(self, id: str) -> bool:
+        """
+        Downloads the vector store for the given ID from Amazon S3.
+
+        Args:
+            id (str): The ID of the vector store to download.
+
+        Returns:
+            bool: True if the vector store was successfully downloaded, False otherwise.
+        """
+        deleteLocalVectorStore(id)
+
+        Path(f"./vectorStore/{id}").mkdir(parents=True, exist_ok=True)
+
+        try:
+            keys = self.__listS3KeysFor(id)
+            if len(keys) == 0:
                 debug("No vectorstore found, cannot download")
                 return False
-            for content in res["Contents"]:
-                key = content["Key"]
+            jobs = []
+            fathers = set()
+            for key in keys:
                 file_name = key.split("/")[-1]
                 father = "/".join(key.split("/")[2:-1])
-                if father:
-                    if not os.path.exists(f"./vectorStore/{id}/{father}"):
-                        os.mkdir(f"./vectorStore/{id}/{father}")
+                if father and father not in fathers:
+                    Path(f"./vectorStore/{id}/{father}").mkdir(parents=True, exist_ok=True)
+                    fathers.add(father)
                 debug(f"Downloading {file_name} from {key}")
-                __bucket.download_file(key, f"./vectorStore/{id}/{father}/{file_name}")
+                jobs.append(partial(self.s3.download_file, self.name, key, f"./vectorStore/{id}/{father}/{file_name}",
+                                    Config=transferConfig))
+            self.__runTransfers(jobs)
             return True
-        
+
         except Exception as e:
             debug("ERROR:", e)
-            debug("Retrying...")
-            sleep(3)
-    debug("Failed to download vectorstore, deleting local copy")
-    deleteLocalVectorStore(id)
-    return False
+        debug("Failed to download vectorstore, deleting local copy")
+        deleteLocalVectorStore(id)
+        return False
 
 
-def __upload_file(id, file_name, father=None) -> bool:
-    """
-    Uploads a file to the specified location in the vector store. Not to be called directly.
+    def __upload_file(self, id, file_name, father=None) -> bool:
+        """
+        Uploads a file to the specified location in the vector store. Not to be called directly.
 
-    Args:
-        id (str): The ID of the vector store.
-        file_name (str): The name of the file to upload.
-        father (str, optional): The parent directory in the vector store. Defaults to None.
+        Args:
+            id (str): The ID of the vector store.
+            file_name (str): The name of the file to upload.
+            father (str, optional): The parent directory in the vector store. Defaults to None.
+
+        Returns:
+            bool: True if the file was successfully uploaded, False otherwise.
+        """
+        if father:
+            path = f"vectorstores/{id}/{father}/{file_name}"
+        else:
+            path = f"vectorstores/{id}/{file_name}"
+        file_name = f"./vectorStore/{id}/{father}/{file_name}" if father else f"./vectorStore/{id}/{file_name}"
+        debug(f"Uploading {file_name} to {path}")
 
-    Returns:
-        bool: True if the file was successfully uploaded, False otherwise.
-    """
-    __checkS3init()
-    
-    if father:
-        path = f"vectorstores/{id}/{father}/{file_name}"
-    else:
-        path = f"vectorstores/{id}/{file_name}"
-    file_name = f"./vectorStore/{id}/{father}/{file_name}" if father else f"./vectorStore/{id}/{file_name}"
-    debug(f"Uploading {file_name} to {path}")
-    
-    for retry in range(retryTimes):
         try:
-            __bucket.upload_file(file_name, path)
+            self.s3.upload_file(file_name, self.name, path, Config=transferConfig)
             return True
         except Exception as e:
             debug("ERROR:", e)
-            debug("Retrying...")
-            sleep(3)
-    debug(f"Failed to upload {file_name} to {path}")
-    return False
+        debug(f"Failed to upload {file_name} to {path}")
+        return False
 
 
-def __uploadS3VectorstoreFor(id: str, path=None, father=None) -> bool:
-    """
-    Uploads the vector store for the given ID to S3 storage.
+    def __uploadS3VectorstoreFor(self, id: str) -> bool:
+        """
+        Uploads the vector store for the given ID to S3 storage.
 
-    Args:
-        id (str): The ID of the vector store.
-        path (str, optional): The path to the vector store directory. Not to be used directly.
-        father (str, optional): The parent directory in S3 storage. Not to be used directly.
-    Returns:
-        bool: True if the vector store was successfully uploaded, False otherwise.
-    """
-    if path is None:
+        Args:
+            id (str): The ID of the vector store.
+        Returns:
+            bool: True if the vector store was successfully uploaded, False otherwise.
+        """
         path = os.path.abspath(f"./vectorStore/{id}")
-    deleteS3VectorstoreFor(id)
-    list_of_files = os.listdir(path)
-    for file_name in list_of_files:
-        file_path = os.path.join(path, file_name)
-        if os.path.isdir(file_path):
-            fatherPath = father + "/" + file_name if father else file_name
-            __uploadS3VectorstoreFor(id, file_path, fatherPath)
-        else:
-            if not __upload_file(id, file_name, father):
-                debug(f"Failed to upload {file_name}, causing the whole vectorstore to fail")
-                debug(f"Deleting vectorstore {id} for both local and S3 storage")
-                deleteS3VectorstoreFor(id)
-                deleteLocalVectorStore(id)
-                return False
-    return True
+        if not os.path.isdir(path):
+            debug(f"No local vectorstore found at {path}, nothing to upload")
+            return False
+        jobs = []
+        for root, _, files in os.walk(path):
+            father = os.path.relpath(root, path)
+            father = None if father == "." else father.replace(os.sep, "/")
+            for file_name in files:
+                jobs.append(partial(self.__upload_file, id, file_name, father))
+        if len(jobs) == 0:
+            debug(f"Local vectorstore {path} is empty, nothing to upload")
+            return False
+        self.deleteS3VectorstoreFor(id)
+        results = self.__runTransfers(jobs)
+        self.checkCache.pop(id, None)
+        clearSharedCache(self.name, id)
+        if not all(results):
+            debug(f"Failed to upload a file of {path}, causing the whole vectorstore to fail")
+            debug(f"Deleting vectorstore {id} for both local and S3 storage")
+            self.deleteS3VectorstoreFor(id)
+            deleteLocalVectorStore(id)
+            return False
+        return True
 
 
 def __buildVectorStoreFromDocuments(listOfDocuments: List[Document], id) -> Chroma:
@@ -341,16 +546,14 @@ def __buildVectorStoreFromDocuments(listOfDocuments: List[Document], id) -> Chro
         Chroma: The built vector store.
 
     """
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1000, chunk_overlap=200, add_start_index=True
-    )
-    all_splits = text_splitter.split_documents(documents=listOfDocuments)
+    all_splits = __textSplitter.split_documents(documents=listOfDocuments)
 
     filtered_splits = filter_complex_metadata(all_splits)
     debug(len(filtered_splits))
     path = os.path.abspath(f"./vectorStore/{id}")
 
-    return Chroma.from_documents(documents=filtered_splits, embedding=OpenAIEmbeddings(), persist_directory=path)
+    return Chroma.from_documents(documents=filtered_splits, embedding=getEmbeddings(),
+                                 persist_directory=path, collection_metadata=hnswConfig)
 
 
 def __load_document(id) -> List[Document]:
@@ -372,34 +575,75 @@ def __load_document(id) -> List[Document]:
     if not os.path.exists(filesLocation):
         raise Exception(f"Product knowledge pool for {id} does not exist, you must first setup the product knowledge pool for this product ID")
 
-    listOfFiles = os.listdir(filesLocation)
-    debug(listOfFiles)
+    with os.scandir(filesLocation) as entries:
+        listOfFiles = sorted((entry for entry in entries if entry.is_file()), key=lambda entry: entry.name)
+    debug([entry.name for entry in listOfFiles])
 
-    listOfDocuments = []
-    for file in listOfFiles:
-        file_type = os.path.splitext(file)[1]
-        if file_type == ".docx" or file_type == ".doc":
-            loader = Docx2txtLoader(file_path=os.path.join(filesLocation, file))
-            doc = loader.load()
-            listOfDocuments.extend(doc)
-            debug(f"{file} loaded with docx parser, elements count: {len(doc)}")
-        elif file_type == ".xlsx" or file_type == ".xls":
-            loader = UnstructuredExcelLoader(file_path=os.path.join(filesLocation, file), mode="elements")
-            doc = loader.load()
-            listOfDocuments.extend(doc)
-            debug(f"{file} loaded with excel parser, elements count: {len(doc)}")
-        elif file_type == ".pdf":
-            loader = PyPDFLoader(file_path=os.path.join(filesLocation, file))
-            doc = loader.load()
-            listOfDocuments.extend(doc)
-            debug(f"{file} loaded with pdf parser, elements count: {len(doc)}")
-        elif file_type == ".txt":
-            with open(os.path.join(filesLocation, file), "r") as f:
-                doc = f.read()
-                listOfDocuments.append(Document(doc))
-                debug(f"{file} loaded with txt parser")
-            f.close()
-        else:
-            debug(f"{file} could not be loaded because of unknown file type (not .docx, .doc, .xlsx, .xls, .pdf, .txt)")
+    fileSignatures = []
+    for entry in listOfFiles:
+        stat = entry.stat()
+        fileSignatures.append((entry.name, stat.st_mtime_ns, stat.st_size))
+    listOfDocuments = list(__parse_documents(filesLocation, tuple(fileSignatures)))
     debug(f"Total number of documents: { len(listOfDocuments) }")
-    return listOfDocuments
\ No newline at end of file
+    return listOfDocuments
+
+
+@lru_cache(maxsize=8)
+def __parse_documents(filesLocation: str, fileSignatures: Tuple[Tuple[str, int, int], ...]) -> Tuple[Document, ...]:
+    """
+    Parse the files of a product knowledge pool. Not to be called directly.
+
+    Results are memoized on the (name, mtime, size) of every file, so a folder is only parsed again after it changed.
+
+    Args:
+        filesLocation (str): The folder of the product knowledge pool.
+        fileSignatures (Tuple[Tuple[str, int, int], ...]): The name, mtime in ns and size of each file in the folder.
+
+    Returns:
+        Tuple[Document, ...]: The documents loaded from all files, in the order of fileSignatures.
+    """
+    listOfFiles = [signature[0] for signature in fileSignatures]
+    listOfDocuments = []
+    if len(listOfFiles) > 0:
+        with ThreadPoolExecutor(max_workers=min(loaderWorkers, len(listOfFiles))) as executor:
+            for doc in executor.map(partial(__load_file, filesLocation), listOfFiles):
+                listOfDocuments.extend(doc)
+    return tuple(listOfDocuments)
+
+
+def __load_file(filesLocation: str, file: str) -> List[Document]:
+    """
+    Load a single file of the product knowledge pool with the parser matching its type. Not to be called directly.
+
+    Args:
+        filesLocation (str): The folder of the product knowledge pool.
+        file (str): The name of the file to load.
+
+    Returns:
+        List[Document]: The documents loaded from the file, empty if the file type is unknown.
+    """
+    file_type = os.path.splitext(file)[1]
+    if file_type == ".docx" or file_type == ".doc":
+        loader = Docx2txtLoader(file_path=os.path.join(filesLocation, file))
+        doc = loader.load()
+        debug(f"{file} loaded with docx parser, elements count: {len(doc)}")
+        return doc
+    elif file_type == ".xlsx" or file_type == ".xls":
+        loader = UnstructuredExcelLoader(file_path=os.path.join(filesLocation, file), mode="elements")
+        doc = loader.load()
+        debug(f"{file} loaded with excel parser, elements count: {len(doc)}")
+        return doc
+    elif file_type == ".pdf":
+        path = os.path.join(filesLocation, file)
+        with __pdfLock:
+            with pymupdf.open(path) as pdf:
+                doc = [Document(page_content=page.get_text("text"), metadata={"source": path, "page": i}) for i, page in enumerate(pdf)]
+        debug(f"{file} loaded with pdf parser, elements count: {len(doc)}")
+        return doc
+    elif file_type == ".txt":
+        with open(os.path.join(filesLocation, file), "r") as f:
+            doc = f.read()
+            debug(f"{file} loaded with txt parser")
+        return [Document(doc)]
+    debug(f"{file} could not be loaded because of unknown file type (not .docx, .doc, .xlsx, .xls, .pdf, .txt)")
+    return []
\ No newline at end of file
@@ -0,0 +1,44 @@
+import importlib.util
+import os
+import sys
+import types
+
+import pytest
+
+# The repository root is the RAGChatbot package itself, so modules are imported directly from it
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def pytest_collection_modifyitems(items):
+    # pytest imports the __init__ of the package containing the tests to look for setup functions. The root
+    # __init__ requires an OpenAI API key and creates data folders in the working directory, and has no setup
+    # functions, so skip that import.
+    for item in items:
+        for node in item.listchain():
+            if isinstance(node, pytest.Package) and str(node.path) == ROOT:
+                node.setup = lambda: None
+
+
+@pytest.fixture
+def loadWithStubs(monkeypatch):
+    """
+    Loads a module of the repository root with stand-ins for its dependencies.
+
+    Returns a function taking the file name and a dict mapping module names to either a dict of attributes for a new
+    stub module or an existing module. The stubs are removed from sys.modules after the test.
+    """
+    def load(fileName, stubs):
+        for name, attributes in stubs.items():
+            if isinstance(attributes, types.ModuleType):
+                module = attributes
+            else:
+                module = types.ModuleType(name)
+                module.__dict__.update(attributes)
+            monkeypatch.setitem(sys.modules, name, module)
+        path = os.path.join(ROOT, fileName)
+        spec = importlib.util.spec_from_file_location(os.path.splitext(fileName)[0] + "UnderTest", path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+    return load
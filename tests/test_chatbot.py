@@ -0,0 +1,141 @@
+import types
+
+import numpy as np
+import pytest
+
+import SemanticCache
+
+
+class FakeHistory:
+    def __init__(self):
+        self.messages = []
+
+    def add_user_message(self, message):
+        self.messages.append(("human", message))
+
+    def add_ai_message(self, message):
+        self.messages.append(("ai", message))
+
+
+class FakeEmbeddings:
+    def __init__(self):
+        self.queries = []
+        self.__vectors = {}
+        self.__rng = np.random.default_rng(0)
+
+    def embed_query(self, text):
+        self.queries.append(text)
+        if text not in self.__vectors:
+            self.__vectors[text] = self.__rng.normal(size=32).astype(np.float32)
+        return self.__vectors[text]
+
+
+class FakeStore:
+    def as_retriever(self, **kwargs):
+        return None
+
+
+class FakeClient:
+    def __init__(self, name):
+        self.name = name
+
+    def getS3VectorStoreFor(self, id):
+        return FakeStore()
+
+
+class FakeConversationalChain:
+    """Stands in for RunnableWithMessageHistory, recording every question that reaches the RAG chain."""
+
+    questions = []
+
+    def __init__(self, chain, getSessionHistory, **kwargs):
+        self.getSessionHistory = getSessionHistory
+
+    def stream(self, input, config):
+        FakeConversationalChain.questions.append(input["input"])
+        history = self.getSessionHistory(config["configurable"]["session_id"])
+        history.add_user_message(input["input"])
+        answer = f"answer {len(FakeConversationalChain.questions)}"
+        yield {"context": []}
+        for piece in answer.split(" "):
+            yield {"answer": piece + " "}
+        history.add_ai_message(answer + " ")
+
+
+@pytest.fixture
+def chatbot(loadWithStubs):
+    FakeConversationalChain.questions = []
+    embeddings = FakeEmbeddings()
+    vectorStore = types.ModuleType("RAGChatbot.VectorStore")
+    vectorStore.getEmbeddings = lambda: embeddings
+    vectorStore.getLocalVectorStoreFor = lambda id: FakeStore()
+    vectorStore.deleteLocalVectorStore = lambda id: True
+    module = loadWithStubs("ChatBot.py", {
+        "langchain_openai": {"ChatOpenAI": lambda **kwargs: None},
+        "RAGChatbot": {"VectorStore": vectorStore},
+        "RAGChatbot.VectorStore": vectorStore,
+        "RAGChatbot.SemanticCache": SemanticCache,
+        "langchain_core.prompts": {
+            "ChatPromptTemplate": type("ChatPromptTemplate", (), {"from_messages": staticmethod(lambda messages: None)}),
+            "MessagesPlaceholder": lambda name: None,
+        },
+        "langchain.chains": {
+            "create_history_aware_retriever": lambda *args: None,
+            "create_retrieval_chain": lambda *args: None,
+        },
+        "langchain.chains.combine_documents": {"create_stuff_documents_chain": lambda *args: None},
+        "langchain_core.runnables.history": {"RunnableWithMessageHistory": FakeConversationalChain},
+        "langchain_community.chat_message_histories": {"ChatMessageHistory": FakeHistory},
+    })
+    module.embeddings = embeddings
+    yield module
+    for bucket in ("bucket", "other", None):
+        SemanticCache.clearSharedCache(bucket, "product")
+
+
+def ask(bot, question):
+    return "".join(bot.ask_question(question))
+
+
+def test_first_question_is_answered_from_cache_and_recorded_in_history(chatbot):
+    first = chatbot.ChatBot("product", client=FakeClient("bucket"))
+    answer = ask(first, "What is the price?")
+
+    second = chatbot.ChatBot("product", client=FakeClient("bucket"))
+    assert ask(second, "what is  the PRICE?") == answer
+    assert FakeConversationalChain.questions == ["What is the price?"]
+    assert second.history.messages == [("human", "what is  the PRICE?"), ("ai", answer)]
+
+
+def test_follow_up_questions_never_read_or_write_the_cache(chatbot):
+    cache = SemanticCache.getSharedCache("bucket", "product")
+    bot = chatbot.ChatBot("product", client=FakeClient("bucket"))
+    ask(bot, "What is the price?")
+    assert len(cache) == 1
+    assert len(chatbot.embeddings.queries) == 1
+
+    ask(bot, "What is the price?")
+    ask(bot, "What about its warranty?")
+    assert FakeConversationalChain.questions == ["What is the price?", "What is the price?", "What about its warranty?"]
+    assert len(chatbot.embeddings.queries) == 1
+    assert len(cache) == 1
+
+
+def test_caches_are_not_shared_between_buckets(chatbot):
+    ask(chatbot.ChatBot("product", client=FakeClient("bucket")), "What is the price?")
+    ask(chatbot.ChatBot("product", client=FakeClient("other")), "What is the price?")
+    assert len(FakeConversationalChain.questions) == 2
+
+
+def test_cleared_cache_is_not_used_by_new_chatbots(chatbot):
+    ask(chatbot.ChatBot("product", client=FakeClient("bucket")), "What is the price?")
+    SemanticCache.clearSharedCache("bucket", "product")
+    ask(chatbot.ChatBot("product", client=FakeClient("bucket")), "What is the price?")
+    assert len(FakeConversationalChain.questions) == 2
+
+
+def test_cache_can_be_disabled(chatbot):
+    ask(chatbot.ChatBot("product", client=FakeClient("bucket"), use_cache=False), "What is the price?")
+    ask(chatbot.ChatBot("product", client=FakeClient("bucket"), use_cache=False), "What is the price?")
+    assert len(FakeConversationalChain.questions) == 2
+    assert chatbot.embeddings.queries == []
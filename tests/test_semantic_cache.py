@@ -0,0 +1,102 @@
+import numpy as np
+import pytest
+
+import SemanticCache
+from SemanticCache import SemanticCache as Cache, quantize, topkCosine
+
+
+def randomVectors(count, dim=64, seed=0):
+    return np.random.default_rng(seed).normal(size=(count, dim)).astype(np.float32)
+
+
+def quantizeAll(vectors):
+    quantized = np.stack([quantize(vector)[0] for vector in vectors])
+    return quantized, np.linalg.norm(quantized.astype(np.float32), axis=1).astype(np.float32)
+
+
+def test_lookup_on_empty_cache_misses():
+    assert Cache().lookup(randomVectors(1)[0]) is None
+
+
+def test_lookup_returns_answer_of_same_question():
+    vectors = randomVectors(3)
+    cache = Cache()
+    for i, vector in enumerate(vectors):
+        cache.add(vector, f"answer {i}")
+    assert cache.lookup(vectors[1]) == "answer 1"
+    assert cache.lookup(vectors[1] * 2) == "answer 1"
+
+
+def test_lookup_misses_below_threshold():
+    vectors = randomVectors(2)
+    cache = Cache(threshold=0.95)
+    cache.add(vectors[0], "answer")
+    assert cache.lookup(vectors[1]) is None
+
+
+def test_zero_vectors_are_ignored():
+    cache = Cache()
+    cache.add(np.zeros(8), "answer")
+    assert len(cache) == 0
+    cache.add(np.ones(8), "answer")
+    assert cache.lookup(np.zeros(8)) is None
+
+
+def test_full_cache_evicts_least_recently_used():
+    vectors = randomVectors(4)
+    cache = Cache(maxsize=3)
+    for i in range(3):
+        cache.add(vectors[i], f"answer {i}")
+    assert cache.lookup(vectors[0]) == "answer 0"
+    cache.add(vectors[3], "answer 3")
+    assert len(cache) == 3
+    assert cache.lookup(vectors[1]) is None
+    assert cache.lookup(vectors[0]) == "answer 0"
+    assert cache.lookup(vectors[3]) == "answer 3"
+
+
+def test_clear_removes_all_answers():
+    vectors = randomVectors(2)
+    cache = Cache()
+    cache.add(vectors[0], "answer")
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.lookup(vectors[0]) is None
+    cache.add(vectors[1], "other")
+    assert cache.lookup(vectors[1]) == "other"
+
+
+def test_quantize_round_trips_within_one_step():
+    vector = randomVectors(1)[0]
+    quantized, scale = quantize(vector)
+    assert quantized.dtype == np.int8
+    assert np.abs(quantized).max() == 127
+    assert np.allclose(quantized * scale, vector, atol=scale / 2 + 1e-6)
+    assert quantize(np.zeros(4))[1] == 0
+
+
+def test_topk_cosine_matches_float_cosine():
+    vectors = randomVectors(200, dim=256)
+    quantized, norms = quantizeAll(vectors)
+    query, _ = quantize(vectors[5])
+    indices, scores = topkCosine(quantized, norms, query, np.linalg.norm(query.astype(np.float32)), 5)
+
+    exact = vectors @ vectors[5] / (np.linalg.norm(vectors, axis=1) * np.linalg.norm(vectors[5]))
+    assert list(indices) == list(np.argsort(exact)[::-1][:5])
+    assert np.allclose(scores, exact[indices], atol=0.01)
+    assert list(scores) == sorted(scores, reverse=True)
+
+
+def test_numba_kernel_matches_numpy_scan(monkeypatch):
+    if SemanticCache.numba is None:
+        pytest.skip("numba is not installed")
+    vectors = randomVectors(150, dim=128)
+    quantized, norms = quantizeAll(vectors)
+    query, _ = quantize(vectors[0])
+    queryNorm = np.linalg.norm(query.astype(np.float32))
+    expected = topkCosine(quantized, norms, query, queryNorm, 10)
+
+    monkeypatch.setattr(SemanticCache, "jitMinRows", 0)
+    indices, scores = topkCosine(quantized, norms, query, queryNorm, 10)
+    assert list(indices) == list(expected[0])
+    assert np.allclose(scores, expected[1], atol=1e-5)
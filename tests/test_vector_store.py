@@ -0,0 +1,139 @@
+import os
+import types
+
+import pytest
+
+import SemanticCache
+
+
+class FakePaginator:
+    def __init__(self, s3):
+        self.s3 = s3
+
+    def paginate(self, Bucket, Prefix):
+        keys = sorted(key for key in self.s3.objects if key.startswith(Prefix))
+        for start in range(0, len(keys), 1000):
+            yield {"Contents": [{"Key": key} for key in keys[start:start + 1000]]}
+
+
+class FakeS3:
+    """Stands in for a boto3 S3 client, keeping the objects of a single bucket in memory."""
+
+    def __init__(self, objects=()):
+        self.objects = {key: b"" for key in objects}
+        self.deleteBatches = []
+        self.deleteErrors = []
+        self.failingDownloads = set()
+
+    def get_paginator(self, operation):
+        assert operation == "list_objects_v2"
+        return FakePaginator(self)
+
+    def list_objects_v2(self, Bucket, Prefix, MaxKeys):
+        return {"KeyCount": min(MaxKeys, sum(key.startswith(Prefix) for key in self.objects))}
+
+    def delete_objects(self, Bucket, Delete):
+        assert Delete["Quiet"]
+        keys = [obj["Key"] for obj in Delete["Objects"]]
+        self.deleteBatches.append(len(keys))
+        for key in keys:
+            self.objects.pop(key, None)
+        return {"Errors": self.deleteErrors} if self.deleteErrors else {}
+
+    def upload_file(self, file_name, bucket, key, Config=None):
+        with open(file_name, "rb") as f:
+            self.objects[key] = f.read()
+
+    def download_file(self, bucket, key, file_name, Config=None):
+        with open(file_name, "wb") as f:
+            f.write(self.objects[key])
+        if key in self.failingDownloads:
+            raise Exception(f"Connection reset while downloading {key}")
+
+
+class FakeChroma:
+    def __init__(self, **kwargs):
+        raise Exception("No Chroma database in the tests")
+
+
+@pytest.fixture
+def vectorStore(loadWithStubs, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    module = loadWithStubs("VectorStore.py", {
+        "langchain_community.document_loaders.word_document": {"Docx2txtLoader": None},
+        "langchain_community.document_loaders": {"UnstructuredExcelLoader": None},
+        "pymupdf": {},
+        "langchain_core.documents": {"Document": None},
+        "langchain_core.embeddings": {"Embeddings": type("Embeddings", (), {})},
+        "langchain_text_splitters": {"RecursiveCharacterTextSplitter": lambda **kwargs: None},
+        "langchain_chroma": {"Chroma": FakeChroma},
+        "langchain_openai": {"OpenAIEmbeddings": lambda **kwargs: None},
+        "langchain_community.vectorstores.utils": {"filter_complex_metadata": lambda splits: splits},
+        "boto3": {"client": None},
+        "boto3.s3": types.ModuleType("boto3.s3"),
+        "boto3.s3.transfer": {"TransferConfig": lambda **kwargs: kwargs},
+        "botocore.config": {"Config": None},
+        "RAGChatbot.SemanticCache": SemanticCache,
+    })
+    yield module
+    SemanticCache.clearSharedCache("bucket", "p")
+
+
+def makeClient(vectorStore, objects=()):
+    s3 = FakeS3(objects)
+    return vectorStore.VectorStoreClient("bucket", s3=s3), s3
+
+
+def upload(client, id):
+    return client._VectorStoreClient__uploadS3VectorstoreFor(id)
+
+
+def writeFile(path, content=b"data"):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(content)
+
+
+def test_delete_batches_keys_by_thousand(vectorStore):
+    client, s3 = makeClient(vectorStore, [f"vectorstores/p/{i:04}.bin" for i in range(2500)])
+    assert client.deleteS3VectorstoreFor("p")
+    assert s3.deleteBatches == [1000, 1000, 500]
+    assert s3.objects == {}
+
+
+def test_delete_fails_when_a_key_is_not_deleted(vectorStore):
+    client, s3 = makeClient(vectorStore, ["vectorstores/p/a.bin"])
+    s3.deleteErrors = [{"Key": "vectorstores/p/a.bin", "Code": "AccessDenied", "Message": "Access Denied"}]
+    assert not client.deleteS3VectorstoreFor("p")
+
+
+def test_prefix_does_not_match_longer_ids(vectorStore):
+    client, s3 = makeClient(vectorStore, ["vectorstores/ab/a.bin"])
+    assert not client.checkS3VectorStoreFor("a")
+    assert client.deleteS3VectorstoreFor("a")
+    assert s3.deleteBatches == []
+    assert list(s3.objects) == ["vectorstores/ab/a.bin"]
+
+
+def test_upload_of_missing_or_empty_store_keeps_s3_copy(vectorStore):
+    client, s3 = makeClient(vectorStore, ["vectorstores/p/a.bin"])
+    assert not upload(client, "p")
+    os.makedirs("vectorStore/p/sub")
+    assert not upload(client, "p")
+    assert s3.deleteBatches == []
+    assert list(s3.objects) == ["vectorstores/p/a.bin"]
+
+
+def test_upload_keeps_nested_directories_in_keys(vectorStore):
+    client, s3 = makeClient(vectorStore, ["vectorstores/p/old.bin"])
+    writeFile("vectorStore/p/a.txt", b"a")
+    writeFile("vectorStore/p/sub/b.txt", b"b")
+    assert upload(client, "p")
+    assert s3.objects == {"vectorstores/p/a.txt": b"a", "vectorstores/p/sub/b.txt": b"b"}
+
+
+def test_failed_download_removes_partial_local_copy(vectorStore):
+    client, s3 = makeClient(vectorStore, ["vectorstores/p/a.bin", "vectorstores/p/sub/b.bin"])
+    s3.failingDownloads.add("vectorstores/p/sub/b.bin")
+    assert client.getS3VectorStoreFor("p") is None
+    assert not os.path.exists("vectorStore/p")